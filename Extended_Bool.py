@@ -1,95 +1,151 @@
 import os
+import pickle
 import re
+import tempfile
+from array import array
+from bisect import bisect_left
 from collections import defaultdict
+from functools import lru_cache
+from types import MappingProxyType
 from nltk.corpus import stopwords
 from nltk.stem import PorterStemmer
-from nltk.tokenize import word_tokenize
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Initialize stop words and stemmer
 stop_words = set(stopwords.words('english'))
 stemmer = PorterStemmer()
 
+# Runs of Unicode letters and digits (same words as splitting on \W+, minus underscores)
+# Unlike the old word_tokenize pass, 'cannot' stays one word instead of splitting into the stop words 'can' + 'not'
+_TOKEN_RE = re.compile(r"[^\W_]+")
+# Boolean operators recognised between query terms
+_OPERATORS = {'and', 'or', 'not'}
+
+# Shared read-only default for terms missing from the positional index
+_EMPTY_DICT = MappingProxyType({})
+
+# Stem each distinct surface form only once across the whole corpus
+@lru_cache(maxsize=1 << 20)
+def _stem(word):
+    return stemmer.stem(word)
+
 # Preprocess text (Tokenization, case folding, stop word removal, stemming)
 def preprocess(text, stem=True):
-    # Case folding
-    text = text.lower()
-    
-    # Tokenization and removing non-alphanumeric characters
-    tokens = word_tokenize(re.sub(r'\W+', ' ', text))
+    # Case folding and tokenization on runs of letters and digits
+    tokens = _TOKEN_RE.findall(text.lower())
     
     # Remove stop words and apply stemming (optional based on flag)
+    stops = stop_words
     if stem:
-        tokens = [stemmer.stem(word) for word in tokens if word not in stop_words]
+        tokens = [_stem(word) for word in tokens if word not in stops]
     else:
-        tokens = [word for word in tokens if word not in stop_words]
+        tokens = [word for word in tokens if word not in stops]
     
     return tokens
 
-# Create Inverted Index
-def build_inverted_index(documents):
-    inverted_index = defaultdict(set)
-    
-    for doc_id, text in documents.items():
-        tokens = preprocess(text)
-        for token in tokens:
-            inverted_index[token].add(doc_id)
-    
-    return inverted_index
+# Worker for preprocess_documents; must be top level so it can be pickled
+def _preprocess_document(item):
+    doc_id, text = item
+    return doc_id, preprocess(text)
 
-# Create Biword Index (for phrase queries)
-def build_biword_index(documents):
-    biword_index = defaultdict(set)
-    
-    for doc_id, text in documents.items():
-        # Preprocess the text with stemming to ensure consistency
-        tokens = preprocess(text)
-        
-        # Create biwords
-        for i in range(len(tokens) - 1):
-            biword = f"{tokens[i]} {tokens[i + 1]}"
-            biword_index[biword].add(doc_id)
-    
-    return biword_index
+# Preprocess every document once, spreading the CPU-bound tokenizing and stemming across processes
+def preprocess_documents(documents):
+    with ProcessPoolExecutor() as executor:
+        return dict(executor.map(_preprocess_document, documents.items(), chunksize=32))
 
-# Create Positional Index
-def build_positional_index(documents):
-    positional_index = defaultdict(lambda: defaultdict(list))
+# Create the Inverted, Biword (for phrase queries) and Positional Indexes in one pass over the tokens
+# Inverted and biword postings are bitmaps stored in a Python int: bit doc_id is set when the document contains the term
+def build_all_indexes(tokenized_documents):
+    inverted_index = defaultdict(int)
+    biword_index = defaultdict(int)
+    positional_index = {}
     
-    for doc_id, text in documents.items():
-        tokens = preprocess(text)
-        
-        # Store the positions of each token in the document
+    for doc_id, tokens in tokenized_documents.items():
+        doc_bit = 1 << doc_id
+        last = len(tokens) - 1
         for position, token in enumerate(tokens):
-            positional_index[token][doc_id].append(position)
+            inverted_index[token] |= doc_bit
+            
+            # Store the positions of each token in the document
+            positional_index.setdefault(token, {}).setdefault(doc_id, []).append(position)
+            
+            # Create biwords
+            if position < last:
+                biword_index[f"{token} {tokens[position + 1]}"] |= doc_bit
     
-    return positional_index
+    # Pack each position list into a contiguous int32 array
+    positional_index = {
+        token: {doc_id: array('i', positions) for doc_id, positions in postings.items()}
+        for token, postings in positional_index.items()
+    }
+    
+    return dict(inverted_index), dict(biword_index), positional_index
 
-# Process Boolean Query
-def process_query(query, inverted_index):
-    query = query.lower()
-    terms = re.split(r'\s+(and|or|not)\s+', query)
+# Parse a Boolean query into OR-separated groups of AND-ed terms
+# Precedence is NOT > AND > OR; 'a not b' and 'a and not b' both mean a AND NOT b; each group is (terms, excluded terms)
+def parse_query(query):
+    # Split into operators and operands; consecutive non-operator words form one operand
+    items = []
+    for word in query.lower().split():
+        if word in _OPERATORS:
+            items.append(word)
+        elif items and items[-1] not in _OPERATORS:
+            items[-1] += ' ' + word
+        else:
+            items.append(word)
     
-    result = set()
-    operator = None
+    groups = [([], [])]
+    new_group = negated = False
     
-    for term in terms:
-        if term in ['and', 'or', 'not']:
-            operator = term
+    for item in items:
+        if item == 'or':
+            new_group = True
+            negated = False  # A NOT whose operand was a stop word does nothing
+        elif item == 'not':
+            negated = True
+        elif item == 'and':
+            negated = False
         else:
-            # Process individual term (stemming)
-            term_tokens = preprocess(term)
+            # Process individual term (stemming); stop words drop out of the query
+            term_tokens = preprocess(item)
             if term_tokens:
-                term_results = inverted_index.get(term_tokens[0], set())
-                if operator == 'not':
-                    result -= term_results
-                elif operator == 'or':
-                    result |= term_results
+                # A pending OR only takes effect once a real term consumes it
+                if new_group:
+                    groups.append(([], []))
+                terms, excluded = groups[-1]
+                if negated:
+                    excluded.append(term_tokens[0])
                 else:  # Default to 'and'
-                    if result:
-                        result &= term_results
-                    else:
-                        result = term_results
+                    terms.append(term_tokens[0])
+                new_group = negated = False
+    
+    return groups
+
+# Process Boolean Query
+# doc_count is the number of documents, so a group of only NOT terms ('not apple') starts from every document
+def process_query(query, inverted_index, doc_count):
+    result = 0
+    
+    for terms, excluded in parse_query(query):
+        if terms:
+            # Intersect the rarest terms first and stop as soon as the group is empty
+            postings = sorted((inverted_index.get(term, 0) for term in terms), key=int.bit_count)
+            group_result = postings[0]
+            for term_postings in postings[1:]:
+                group_result &= term_postings
+                if not group_result:
+                    break
+        elif excluded:
+            group_result = (1 << doc_count) - 1
+        else:
+            continue  # Every term was a stop word
+        for term in excluded:
+            if not group_result:
+                break
+            group_result &= ~inverted_index.get(term, 0)
+        
+        result |= group_result
     
     return result
 
@@ -103,27 +159,43 @@ def process_phrase_query(phrase, biword_index):
     
     # Get documents containing all biwords
     if not biwords:
-        return set()  # Return empty if no valid biwords
+        return 0  # Return empty if no valid biwords
     
-    result = biword_index.get(biwords[0], set())  # Start with the first biword
-    for biword in biwords[1:]:
-        result &= biword_index.get(biword, set())  # Intersect with other biword results
+    # Intersect the rarest biwords first so the running result stays as small as possible
+    postings = sorted((biword_index.get(biword, 0) for biword in biwords), key=int.bit_count)
+    result = postings[0]  # Start with the rarest biword
+    for biword_postings in postings[1:]:
+        result &= biword_postings  # Intersect with other biword results
+        if not result:
+            break
     
     return result
 
+# True if some position in p1 is within proximity of some position in p2 (both sorted int32 arrays)
+# Binary-searches each position of the shorter array for the first in-range position of the longer one
+def _prox_match(p1, p2, proximity):
+    if len(p1) > len(p2):
+        p1, p2 = p2, p1
+    size = len(p2)
+    for position in p1:
+        i = bisect_left(p2, position - proximity)
+        if i < size and p2[i] <= position + proximity:
+            return True
+    return False
+
 # Process Proximity Query 
 def process_proximity_query(terms, proximity, positional_index):
     # Preprocess the terms
     terms = preprocess(terms)
     
     if len(terms) < 2:
-        return set()  # A proximity query must have at least two terms
+        return 0  # A proximity query must have at least two terms
     
     # Get the positional data for the first term
-    result_docs = positional_index.get(terms[0], {})
+    result_docs = positional_index.get(terms[0], _EMPTY_DICT)
     
     for term in terms[1:]:
-        next_term_docs = positional_index.get(term, {})
+        next_term_docs = positional_index.get(term, _EMPTY_DICT)
         matching_docs = set()
         
         # Find documents where both terms exist
@@ -132,34 +204,105 @@ def process_proximity_query(terms, proximity, positional_index):
                 term2_positions = next_term_docs[doc_id]
                 
                 # Check for proximity match
-                for pos1 in positions:
-                    for pos2 in term2_positions:
-                        if abs(pos1 - pos2) <= proximity:
-                            matching_docs.add(doc_id)
+                if _prox_match(positions, term2_positions, proximity):
+                    matching_docs.add(doc_id)
         
         result_docs = {doc_id: result_docs[doc_id] for doc_id in matching_docs}
     
-    return set(result_docs.keys())
+    result = 0
+    for doc_id in result_docs:
+        result |= 1 << doc_id
+    return result
 
 # Load documents from 'Corpus' 
+# Documents are keyed by a compact integer id; doc_names maps each id back to its filename
 def load_documents(corpus_dir='corpus'):
-    documents = {}
-    for filename in os.listdir(corpus_dir):
-        if filename.endswith('.txt'):
-            with open(os.path.join(corpus_dir, filename), 'r', encoding='utf-8') as file:
-                documents[filename] = file.read()
-    return documents
+    with os.scandir(corpus_dir) as entries:
+        paths = {entry.name: entry.path for entry in entries if entry.name.endswith('.txt')}
+    doc_names = sorted(paths)
+    
+    # Reads release the GIL, so threads overlap the per-file I/O latency
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        documents = dict(enumerate(executor.map(_read_document, [paths[name] for name in doc_names])))
+    return documents, doc_names
+
+def _read_document(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+# Map a posting bitmap back to the set of filenames it covers
+def to_doc_names(postings, doc_names):
+    return {doc_names[doc_id] for doc_id in range(postings.bit_length()) if postings >> doc_id & 1}
+
+# Latest modification time of the corpus directory or any document in it
+def corpus_mtime(corpus_dir):
+    with os.scandir(corpus_dir) as entries:
+        return max(
+            [os.path.getmtime(corpus_dir)]
+            + [entry.stat().st_mtime for entry in entries if entry.name.endswith('.txt')]
+        )
+
+# Bump whenever preprocess or the index layout changes so older caches are rebuilt
+INDEX_CACHE_VERSION = 2
+
+# Load previously built indexes, or None if the cache is missing, unreadable, from another version or older than the corpus
+def load_index_cache(cache_file, corpus_dir):
+    try:
+        if os.path.getmtime(cache_file) < corpus_mtime(corpus_dir):
+            return None
+        with open(cache_file, 'rb') as file:
+            cached = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    if not isinstance(cached, tuple) or len(cached) != 5 or cached[0] != INDEX_CACHE_VERSION:
+        return None
+    return cached[1:]
+
+# Save built indexes so the next run can skip tokenization and stemming
+# Written to a temporary file first so an interrupted run never leaves a truncated cache behind
+def save_index_cache(cache_file, doc_names, inverted_index, biword_index, positional_index):
+    fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache_file)),
+                                      prefix=os.path.basename(cache_file) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump((INDEX_CACHE_VERSION, doc_names, inverted_index, biword_index, positional_index),
+                        file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except BaseException:
+        os.remove(temp_file)
+        raise
 
 # Main program
 if __name__ == "__main__":
-    # Load all documents from the Corpus 
     corpus_dir = 'Corpus'  
-    documents = load_documents(corpus_dir)
+    cache_file = 'index_cache.pkl'
+
+    # Reuse the cached indexes when the corpus has not changed since they were built
+    cached = load_index_cache(cache_file, corpus_dir)
+    if cached is not None:
+        doc_names, inverted_index, biword_index, positional_index = cached
+    else:
+        # Load all documents from the Corpus 
+        documents, doc_names = load_documents(corpus_dir)
+
+        # Tokenize and stem every document once, then build the indexes from the tokens
+        tokenized_documents = preprocess_documents(documents)
+        inverted_index, biword_index, positional_index = build_all_indexes(tokenized_documents)
+        save_index_cache(cache_file, doc_names, inverted_index, biword_index, positional_index)
+
+    # The indexes never change after the build, so repeated queries are answered from a cache
+    # Queries are lower-cased before lookup since every processor case-folds them anyway
+    @lru_cache(maxsize=1024)
+    def cached_query(query):
+        return process_query(query, inverted_index, len(doc_names))
+
+    @lru_cache(maxsize=1024)
+    def cached_phrase_query(phrase):
+        return process_phrase_query(phrase, biword_index)
 
-    # Build the indexes
-    inverted_index = build_inverted_index(documents)
-    biword_index = build_biword_index(documents)
-    positional_index = build_positional_index(documents)
+    @lru_cache(maxsize=1024)
+    def cached_proximity_query(terms, proximity):
+        return process_proximity_query(terms, proximity, positional_index)
 
     while True:
         print("Select query type:")
@@ -172,20 +315,23 @@ if __name__ == "__main__":
         
         if choice == '1':
             query = input("Enter Boolean query: ").strip()
-            result = process_query(query, inverted_index)
+            result = cached_query(query.lower())
+            result = to_doc_names(result, doc_names)
             print(f"Documents matching Boolean query '{query}': {result}")
             sys.stdout.flush()
             
         elif choice == '2':
             phrase = input("Enter Phrase query: ").strip()
-            result = process_phrase_query(phrase, biword_index)
+            result = cached_phrase_query(phrase.lower())
+            result = to_doc_names(result, doc_names)
             print(f"Documents matching phrase query '{phrase}': {result}")
             sys.stdout.flush()
             
         elif choice == '3':
             terms = input("Enter Proximity query terms: ").strip()
             proximity_distance = int(input("Enter proximity distance: ").strip())
-            result = process_proximity_query(terms, proximity_distance, positional_index)
+            result = cached_proximity_query(terms.lower(), proximity_distance)
+            result = to_doc_names(result, doc_names)
             print(f"Documents matching proximity query '{terms}' within {proximity_distance} words: {result}")
             sys.stdout.flush()
             
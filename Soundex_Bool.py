@@ -1,48 +1,69 @@
 import os
 import re
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 
 # Initialize stop words
 stop_words = set(stopwords.words('english'))
 
+# Whole words made only of Unicode letters, as splitting on \W+ and keeping isalpha() words did
+# Unlike the old word_tokenize pass, 'cannot' stays one word instead of splitting into the stop words 'can' + 'not'
+_TOKEN_RE = re.compile(r"\b[^\W\d_]+\b")
+# Boolean operators separating query terms
+_OP_SPLIT = re.compile(r"\s+(and|or|not)\s+")
+
+# Shared read-only default for terms missing from the index
+_EMPTY = frozenset()
+
+# Soundex digit for each consonant; H and W are skipped and vowels (and Y) only break runs
+SOUNDEX_CODES = {
+    letter: digit
+    for letters, digit in (('BFPV', '1'), ('CGJKQSXZ', '2'), ('DT', '3'), ('L', '4'), ('MN', '5'), ('R', '6'))
+    for letter in letters
+}
+
 # Soundex Generator Function
 def soundex_generator(token):
     token = token.upper()
     soundex_result = token[0]  # Retain the first letter
 
-    # Remove h's and w's
-    token = re.sub('[hw]', '', token, flags=re.I)
-
-    # Replace consonants with values
-    token = re.sub('[bfpv]+', '1', token, flags=re.I)
-    token = re.sub('[cgjkqsxz]+', '2', token, flags=re.I)
-    token = re.sub('[dt]+', '3', token, flags=re.I)
-    token = re.sub('l+', '4', token, flags=re.I)
-    token = re.sub('[mn]+', '5', token, flags=re.I)
-    token = re.sub('r+', '6', token, flags=re.I)
-
-    # Remove vowels and y's
-    token = re.sub('[aeiouhy]', '', token, flags=re.I)
+    # Single pass: skip h's and w's, collapse runs of the same digit, drop vowels and y's
+    codes = SOUNDEX_CODES
+    digits = []
+    previous = None
+    for char in token:
+        if char == 'H' or char == 'W':
+            continue
+        code = codes.get(char)
+        if code is None:
+            previous = None
+            if char in 'AEIOUY':
+                continue
+            code = char
+        elif code == previous:
+            continue
+        else:
+            previous = code
+        digits.append(code)
 
-    # Take the first 4 digits
-    soundex_result += token[:4].ljust(4, '0')
+        # Take the first 4 digits
+        if len(digits) == 4:
+            break
 
     # Pad with zeros if needed
-    soundex_result = soundex_result.ljust(4, '0')
+    soundex_result += ''.join(digits).ljust(4, '0')
 
     return soundex_result
 
 # Preprocess text (Tokenization, stop word removal, and Soundex)
 def preprocess(text):
-    text = text.lower()
-
-    # Tokenize text into words (basic tokenization)
-    tokens = word_tokenize(re.sub(r'\W+', ' ', text))
+    # Tokenize lower-cased text into words made only of letters
+    tokens = _TOKEN_RE.findall(text.lower())
 
     # Remove stopwords
-    tokens = [word for word in tokens if word not in stop_words and word.isalpha()]
+    stops = stop_words
+    tokens = [word for word in tokens if word not in stops]
 
     # Generate Soundex codes for tokens
     soundex_tokens = [soundex_generator(word) for word in tokens]
@@ -50,8 +71,10 @@ def preprocess(text):
     return tokens, soundex_tokens
 
 # Create Inverted Index with Soundex
+# Words and their Soundex codes are indexed separately: token_index[word] and soundex_index[code] are doc id sets
 def build_inverted_index(documents):
-    inverted_index = defaultdict(lambda: {'tokens': set(), 'soundex': set()})
+    token_index = defaultdict(set)
+    soundex_index = defaultdict(set)
     soundex_mapping = defaultdict(set)
     
     for doc_id, text in documents.items():
@@ -60,17 +83,16 @@ def build_inverted_index(documents):
 
         # Update the inverted index for both tokens and Soundex tokens
         for token in tokens:
-            inverted_index[token]['tokens'].add(doc_id)
+            token_index[token].add(doc_id)
         for soundex_token in soundex_tokens:
-            inverted_index[soundex_token]['soundex'].add(doc_id)
+            soundex_index[soundex_token].add(doc_id)
             soundex_mapping[soundex_token].update(tokens)
     
-    return inverted_index, soundex_mapping
+    return dict(token_index), dict(soundex_index), dict(soundex_mapping)
 
 # Process Boolean Query with Soundex
-def process_query(query, inverted_index):
-    query = query.lower()
-    terms = re.split(r'\s+(and|or|not)\s+', query)
+def process_query(query, token_index, soundex_index):
+    terms = _OP_SPLIT.split(query.lower())
     
     result = set()
     operator = None
@@ -85,13 +107,13 @@ def process_query(query, inverted_index):
             
             term_results = set()
             if term_tokens:
-                term_results.update(inverted_index.get(term_tokens[0], {}).get('tokens', set()))
+                term_results.update(token_index.get(term_tokens[0], _EMPTY))
                 for token in term_tokens:
-                    matched_tokens[token].update(inverted_index.get(token, {}).get('tokens', set()))
+                    matched_tokens[token].update(token_index.get(token, _EMPTY))
             if soundex_tokens:
-                term_results.update(inverted_index.get(soundex_tokens[0], {}).get('soundex', set()))
+                term_results.update(soundex_index.get(soundex_tokens[0], _EMPTY))
                 for soundex_token in soundex_tokens:
-                    matched_tokens[soundex_token].update(inverted_index.get(soundex_token, {}).get('tokens', set()))
+                    matched_tokens[soundex_token].update(token_index.get(soundex_token, _EMPTY))
             
             if operator == 'not':
                 result -= term_results
@@ -106,52 +128,60 @@ def process_query(query, inverted_index):
     return result
 
 # Load documents from 'corpus' directory
+# Documents are keyed by a compact integer id; doc_names maps each id back to its filename
 def load_documents(corpus_dir='corpus'):
-    documents = {}
-    for filename in os.listdir(corpus_dir):
-        if filename.endswith('.txt'):
-            with open(os.path.join(corpus_dir, filename), 'r', encoding='utf-8') as file:
-                documents[filename] = file.read()
-    return documents
+    with os.scandir(corpus_dir) as entries:
+        paths = {entry.name: entry.path for entry in entries if entry.name.endswith('.txt')}
+    doc_names = sorted(paths)
+    
+    # Reads release the GIL, so threads overlap the per-file I/O latency
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        documents = dict(enumerate(executor.map(_read_document, [paths[name] for name in doc_names])))
+    return documents, doc_names
+
+def _read_document(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+# Map a set of integer doc ids back to filenames
+def to_doc_names(doc_ids, doc_names):
+    return {doc_names[doc_id] for doc_id in doc_ids}
 
 # Save Inverted Index
-def save_inverted_index(inverted_index, filename):
+# Words and Soundex codes never collide, so each entry has postings in only one of the two sections
+def save_inverted_index(token_index, soundex_index, doc_names, filename):
+    chunks = []
+    for key, value in token_index.items():
+        tokens = ''.join(f"{doc_names[doc_id]} " for doc_id in value)
+        chunks.append(f"{key} {len(value)} 0\ntokens: {tokens}\nsoundex: \n\n")
+    for key, value in soundex_index.items():
+        soundex = ''.join(f"{doc_names[doc_id]} " for doc_id in value)
+        chunks.append(f"{key} 0 {len(value)}\ntokens: \nsoundex: {soundex}\n\n")
     with open(filename, 'w', encoding='utf-8') as file:
-        for key, value in inverted_index.items():
-            file.write(f"{key} {len(value['tokens'])} {len(value['soundex'])}\n")
-            file.write('tokens: ')
-            for doc_id in value['tokens']:
-                file.write(f"{doc_id} ")
-            file.write('\n')
-            file.write('soundex: ')
-            for doc_id in value['soundex']:
-                file.write(f"{doc_id} ")
-            file.write('\n\n')
+        file.write(''.join(chunks))
 
 # Save Soundex Inverted Index
-def save_soundex_index(inverted_index, filename):
+def save_soundex_index(soundex_index, doc_names, filename):
+    chunks = []
+    for key, value in soundex_index.items():
+        soundex = ''.join(f"{doc_names[doc_id]} " for doc_id in value)
+        chunks.append(f"{key} {len(value)}\nsoundex: {soundex}\n\n")
     with open(filename, 'w', encoding='utf-8') as file:
-        for key, value in inverted_index.items():
-            file.write(f"{key} {len(value['soundex'])}\n")
-            file.write('soundex: ')
-            for doc_id in value['soundex']:
-                file.write(f"{doc_id} ")
-            file.write('\n\n')
+        file.write(''.join(chunks))
 
 # Save Soundex Mapping
 def save_soundex_mapping(soundex_mapping, filename):
     with open(filename, 'w', encoding='utf-8') as file:
-        for key, value in soundex_mapping.items():
-            file.write(f"{key} {' '.join(value)}\n")
+        file.write(''.join(f"{key} {' '.join(value)}\n" for key, value in soundex_mapping.items()))
 
 def main():
     corpus_dir = 'Corpus' 
-    documents = load_documents(corpus_dir)
+    documents, doc_names = load_documents(corpus_dir)
 
-    inverted_index, soundex_mapping = build_inverted_index(documents)
+    token_index, soundex_index, soundex_mapping = build_inverted_index(documents)
 
-    save_inverted_index(inverted_index, 'inv.txt')
-    save_soundex_index(inverted_index, 'son.txt')
+    save_inverted_index(token_index, soundex_index, doc_names, 'inv.txt')
+    save_soundex_index(soundex_index, doc_names, 'son.txt')
     save_soundex_mapping(soundex_mapping, 'soundex_mapping.txt')
 
     while True:
@@ -159,7 +189,7 @@ def main():
         if query.lower() == 'exit':
             break
         
-        result = process_query(query, inverted_index)
+        result = to_doc_names(process_query(query, token_index, soundex_index), doc_names)
         print(f"Documents matching '{query}': {result}")
 
 if __name__ == "__main__":